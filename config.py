@@ -23,6 +23,23 @@ RESEND_API_KEY = "your_resend_api_key" # We can get this later.
 RESEND_API_URL = "https://api.resend.com/emails" 
 FROM_EMAIL = "onboarding@resend.com" # Free Tier uses this.
 
+# Scheduling settings
+BOOKING_DURATION_MINUTES = 30 # Length of one consultation (also the slot size).
+PROVIDER_CAPACITY = 1 # How many consultations can run at the same time.
+BUSINESS_HOURS_START = 9 # First slot starts at 9:00.
+BUSINESS_HOURS_END = 17 # Last slot must end by 17:00.
+SLOT_OFFER_COUNT = 3 # How many open slots the bot offers.
+
+# Reminder daemon settings
+REMINDER_LEAD_TIME_HOURS = 24 # Send the reminder this long before the booking.
+REMINDER_POLL_SECONDS = 5 # How often the daemon checks for new bookings.
+REMINDER_RETRY_SECONDS = 300 # Wait before retrying a failed email.
+REMINDER_MAX_ATTEMPTS = 3 # Give up on a reminder after this many failed sends.
+
+# Export job settings
+EXPORT_DIR = "exports" # Where export files and manifests are written.
+EXPORT_CHUNK_SIZE = 10000 # Rows fetched per chunk - keeps memory bounded.
+
 # Agent name
 AGENT_NAME = "HealthBot"
 
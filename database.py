@@ -1,6 +1,7 @@
 import sqlite3
 from datetime import datetime
-from config import DATABASE_NAME
+from config import DATABASE_NAME, BOOKING_DURATION_MINUTES
+from extractor import normalize_email, normalize_phone, normalize_timestamp
 
 def get_connection():
     '''
@@ -31,10 +32,25 @@ def initialize_database():
             full_name TEXT,
             email TEXT,
             phone TEXT,
+            email_key TEXT,
+            phone_key TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
 
+    # email_key / phone_key are NORMALIZED contact values (see extractor.py).
+    # Older databases don't have them yet - add them and fill them in.
+    cursor.execute('PRAGMA table_info(profiles)')
+    profile_columns = [row[1] for row in cursor.fetchall()]
+    needs_backfill = 'email_key' not in profile_columns
+    if needs_backfill:
+        cursor.execute('ALTER TABLE profiles ADD COLUMN email_key TEXT')
+        cursor.execute('ALTER TABLE profiles ADD COLUMN phone_key TEXT')
+
+    # Indexes make identity lookups O(log n) instead of a full table scan.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_profiles_email_key ON profiles (email_key)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_profiles_phone_key ON profiles (phone_key)')
+
     # SESSIONS table - one row per conversation.
     # profile_id links to profiles table (FOREIGN KEY)
     cursor.execute('''
@@ -62,12 +78,13 @@ def initialize_database():
 
     # BOOKINGS tables - scheduled consulatations.
     # Links to both profiles and sessions.
-    cursor.execute('''
+    cursor.execute(f'''
         CREATE TABLE IF NOT EXISTS bookings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             profile_id INTEGER,
             session_id INTEGER,
             scheduled_for TIMESTAMP,
+            duration_minutes INTEGER DEFAULT {BOOKING_DURATION_MINUTES},
             reminder_sent BOOLEAN DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (profile_id) REFERENCES profiles (id),
@@ -75,8 +92,59 @@ def initialize_database():
         )
     ''')
 
+    # Older databases were created before bookings had a duration.
+    # CREATE TABLE IF NOT EXISTS won't change them, so add the column.
+    cursor.execute('PRAGMA table_info(bookings)')
+    booking_columns = [row[1] for row in cursor.fetchall()]
+    if 'duration_minutes' not in booking_columns:
+        cursor.execute(
+            f'ALTER TABLE bookings ADD COLUMN duration_minutes INTEGER DEFAULT {BOOKING_DURATION_MINUTES}'
+        )
+
+    # Conflict checks look up bookings by time range.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_scheduled_for ON bookings (scheduled_for)')
+
+    # Older databases may have scheduled_for in other ISO forms ('T', UTC
+    # offsets). Rewrite them once; user_version records that it's done.
+    cursor.execute('PRAGMA user_version')
+    if cursor.fetchone()[0] < 1:
+        cursor.execute('SELECT id, scheduled_for FROM bookings WHERE scheduled_for IS NOT NULL')
+        cursor.executemany(
+            'UPDATE bookings SET scheduled_for = ? WHERE id = ?',
+            [(normalize_timestamp(scheduled_for), booking_id)
+             for booking_id, scheduled_for in cursor.fetchall()
+             if normalize_timestamp(scheduled_for) != scheduled_for]
+        )
+        cursor.execute('PRAGMA user_version = 1')
+
+    # PROFILE_MERGES table - one row per profile deleted by the dedup job.
+    # The export only sends NEW rows, so this is how downstream copies learn
+    # that merged_profile_id is gone and now lives on as kept_profile_id.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profile_merges (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kept_profile_id INTEGER NOT NULL,
+            merged_profile_id INTEGER NOT NULL,
+            merged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # EXPORT_WATERMARKS table - last exported id per table.
+    # Lets the export job only emit rows added since the previous run.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS export_watermarks (
+            table_name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
     conn.commit()
     conn.close()
+
+    if needs_backfill:
+        backfill_contact_keys()
+
     print("Databse initialized successfully.")
 
 # ============ CRUD Operations ========================
@@ -142,33 +210,65 @@ def get_session_messages(session_id):
     conn.close()
     return messages
 
+def find_profile(cursor, email_key, phone_key):
+    '''
+       Find an existing profile by normalized email OR phone.
+
+       Returns (id, email_key) or None.
+
+       One query - SQLite uses both indexes for the OR. An email match
+       wins over a phone match; the oldest profile wins a tie.
+    '''
+    cursor.execute('''
+        SELECT id, email_key FROM profiles
+        WHERE email_key = ? OR phone_key = ?
+        ORDER BY email_key = ? DESC, id
+        LIMIT 1
+    ''', (email_key, phone_key, email_key))
+    return cursor.fetchone()
+
 def create_or_update_profile(email, full_name=None, phone=None):
     '''
-       Create a profile or update if email exists.
+       Create a profile or update it if the customer already exists.
        
        this is an 'UPSERT' pattern - Update or Insert
        
        Interview term: 'Idempotent operation' - can run multiple times safely.
+
+       'Already exists' means the same email (ignoring case) or the same
+       phone number (ignoring formatting) - this is IDENTITY RESOLUTION.
     '''
+    email_key = normalize_email(email)
+    phone_key = normalize_phone(phone)
+
     conn = get_connection()
     cursor = conn.cursor()
 
-    # First, check if profiles exists.
-    cursor.execute('SELECT id FROM profiles WHERE email = ?', (email,))
-    existing = cursor.fetchone()
+    # First, check if the profile exists.
+    existing = find_profile(cursor, email_key, phone_key)
+
+    # A phone-only match to a profile with a DIFFERENT email is another
+    # customer (e.g. a shared family phone) - don't overwrite their identity.
+    if existing and existing[1] and email_key and existing[1] != email_key:
+        existing = None
 
     if existing:
-        # Update existing profile.
         profile_id = existing[0]
-        cursor.execute(
-            'UPDATE profiles SET full_name = ?, phone = ? WHERE id = ?',
-            (full_name, phone, profile_id)
-        )
+        # Update existing profile - keep old values we didn't extract this time.
+        cursor.execute('''
+            UPDATE profiles SET
+                full_name = COALESCE(?, full_name),
+                email = COALESCE(?, email),
+                phone = COALESCE(?, phone),
+                email_key = COALESCE(?, email_key),
+                phone_key = COALESCE(?, phone_key)
+            WHERE id = ?
+        ''', (full_name, email, phone, email_key, phone_key, profile_id))
     else:
         # Create new profile.
         cursor.execute(
-            'INSERT INTO profiles (full_name, email, phone) VALUES (?, ?, ?)',
-            (full_name, email, phone)
+            'INSERT INTO profiles (full_name, email, phone, email_key, phone_key) VALUES (?, ?, ?, ?, ?)',
+            (full_name, email, phone, email_key, phone_key)
         )
         profile_id = cursor.lastrowid
 
@@ -176,16 +276,20 @@ def create_or_update_profile(email, full_name=None, phone=None):
     conn.close()
     return profile_id
 
-def create_booking(profile_id, session_id, scheduled_for):
+def create_booking(profile_id, session_id, scheduled_for, duration_minutes=BOOKING_DURATION_MINUTES):
     '''
        Create a consultation booking.
+
+       This does NOT check for conflicts - use scheduler.book_slot() for that.
     '''
+    scheduled_for = normalize_timestamp(scheduled_for)
+
     conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute(
-        'INSERT INTO bookings (profile_id, session_id, scheduled_for) VALUES(?, ?, ?)',
-        (profile_id, session_id, scheduled_for)
+        'INSERT INTO bookings (profile_id, session_id, scheduled_for, duration_minutes) VALUES(?, ?, ?, ?)',
+        (profile_id, session_id, scheduled_for, duration_minutes)
     )
 
     booking_id  = cursor.lastrowid
@@ -193,12 +297,94 @@ def create_booking(profile_id, session_id, scheduled_for):
     conn.close()
     return booking_id
 
-def get_pending_reminders():
+def create_booking_if_free(profile_id, session_id, scheduled_for, duration_minutes,
+                           window_start, window_end, conflicts):
+    '''
+       Create a booking only if the slot is still free - checked in the DATABASE.
+
+       Other chat sessions run in other processes, so only the database
+       knows about every booking. BEGIN IMMEDIATE takes the write lock
+       first, so no one can insert between our check and our INSERT.
+
+       - window_start / window_end: bookings starting in this range are
+         the only ones that can overlap (uses idx_bookings_scheduled_for).
+       - conflicts: function that gets those (id, scheduled_for,
+         duration_minutes) rows and returns True if the slot is taken.
+
+       Returns the new booking ID, or None if the slot conflicts.
+
+       All scheduled_for values are stored in one format (normalize_timestamp),
+       so the TEXT range filter below matches every overlapping booking.
+    '''
+    scheduled_for = normalize_timestamp(scheduled_for)
+    window_start = normalize_timestamp(window_start)
+    window_end = normalize_timestamp(window_end)
+
+    conn = get_connection()
+    conn.isolation_level = None # We manage the transaction ourselves.
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            SELECT id, scheduled_for, duration_minutes
+            FROM bookings
+            WHERE scheduled_for >= ? AND scheduled_for < ?
+        ''', (window_start, window_end))
+
+        if conflicts(cursor.fetchall()):
+            cursor.execute('ROLLBACK')
+            return None
+
+        cursor.execute(
+            'INSERT INTO bookings (profile_id, session_id, scheduled_for, duration_minutes) VALUES(?, ?, ?, ?)',
+            (profile_id, session_id, scheduled_for, duration_minutes)
+        )
+        booking_id = cursor.lastrowid
+        cursor.execute('COMMIT')
+        return booking_id
+    except sqlite3.Error:
+        if conn.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def get_booking_intervals(since, after_id=0):
+    '''
+       Get (id, scheduled_for, duration_minutes) for bookings from 'since' on.
+
+       Used to build the scheduler's availability index at startup.
+       Past bookings can't conflict with new ones, so we skip them.
+
+       after_id: only bookings with id > after_id, so the scheduler can
+       pick up bookings made by other sessions without reloading everything.
+    '''
+    since = normalize_timestamp(since)
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT id, scheduled_for, duration_minutes
+        FROM bookings
+        WHERE scheduled_for IS NOT NULL
+        AND scheduled_for >= ?
+        AND id > ?
+    ''', (since, after_id))
+
+    intervals = cursor.fetchall()
+    conn.close()
+    return intervals
+
+def get_pending_reminders(after_id=0):
     ''' 
        Get bookings that need reminder emails.
        
        this is a JOIN query - combining data from multiple tables!
        this is the 'E' in ETL - Extract.
+
+       after_id: only return bookings with id > after_id. The reminder
+       daemon passes its high-water mark so each poll only reads new rows.
     '''
     conn = get_connection()
     cursor = conn.cursor()
@@ -213,7 +399,9 @@ def get_pending_reminders():
         JOIN profiles p ON b.profile_id = p.id
         WHERE b.reminder_sent = 0
         AND b.scheduled_for IS NOT NULL
-    ''')
+        AND b.id > ?
+        ORDER BY b.id
+    ''', (after_id,))
 
     reminders = cursor.fetchall()
     conn.close()
@@ -234,3 +422,324 @@ def mark_reminder_sent(booking_id):
     conn.commit()
     conn.close()
 
+
+def claim_reminder(booking_id):
+    '''
+       Atomically mark a reminder as sent - BEFORE sending it.
+
+       Returns True if we got it, False if someone else already did.
+       The 'AND reminder_sent = 0' makes this safe when the cron job and
+       one or more daemons run at the same time: only one UPDATE can win,
+       so the email goes out once.
+    '''
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        'UPDATE bookings SET reminder_sent = 1 WHERE id = ? AND reminder_sent = 0',
+        (booking_id,)
+    )
+    claimed = cursor.rowcount == 1
+
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def release_reminder(booking_id):
+    ''' Undo claim_reminder() after a failed send, so it can be retried.'''
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        'UPDATE bookings SET reminder_sent = 0 WHERE id = ?',
+        (booking_id,)
+    )
+
+    conn.commit()
+    conn.close()
+
+
+# ============ Identity Resolution ========================
+
+def backfill_contact_keys():
+    '''
+       Fill in email_key / phone_key for profiles that don't have them.
+
+       Normalization happens in Python (extractor.py), so we read, transform,
+       and write back - a tiny ETL job of its own.
+    '''
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT id, email, phone, email_key, phone_key FROM profiles
+        WHERE (email IS NOT NULL AND email_key IS NULL)
+        OR (phone IS NOT NULL AND phone_key IS NULL)
+    ''')
+
+    # Some values can't be normalized (e.g. a 7-digit phone) - their key
+    # stays NULL, so only count rows where a key actually changed.
+    updates = []
+    for profile_id, email, phone, email_key, phone_key in cursor.fetchall():
+        new_email_key = normalize_email(email)
+        new_phone_key = normalize_phone(phone)
+        if (new_email_key, new_phone_key) != (email_key, phone_key):
+            updates.append((new_email_key, new_phone_key, profile_id))
+
+    cursor.executemany(
+        'UPDATE profiles SET email_key = ?, phone_key = ? WHERE id = ?',
+        updates
+    )
+
+    conn.commit()
+    conn.close()
+    return len(updates)
+
+
+def get_duplicate_profile_groups():
+    '''
+       Find groups of profile IDs that belong to the same customer.
+
+       GROUP BY on each key finds direct duplicates. Groups are then joined
+       together (union-find), so if A shares an email with B and B shares a
+       phone with C, all three end up in one group.
+
+       A shared phone can pull in profiles with DIFFERENT emails - those are
+       likely different people. Such a group is only merged by email, and
+       is reported back as a conflict so nothing is merged silently.
+
+       Returns (groups, conflicts): each a list of sorted ID lists.
+    '''
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    pairs = []
+    for key_column in ('email_key', 'phone_key'):
+        cursor.execute(f'''
+            SELECT GROUP_CONCAT(id) FROM profiles
+            WHERE {key_column} IS NOT NULL
+            GROUP BY {key_column}
+            HAVING COUNT(*) > 1
+        ''')
+        pairs.extend(row[0] for row in cursor.fetchall())
+
+    # Union-find: parent[id] points towards the group's representative.
+    parent = {}
+
+    def find(profile_id):
+        parent.setdefault(profile_id, profile_id)
+        while parent[profile_id] != profile_id:
+            parent[profile_id] = parent[parent[profile_id]]
+            profile_id = parent[profile_id]
+        return profile_id
+
+    for id_list in pairs:
+        ids = [int(profile_id) for profile_id in id_list.split(',')]
+        for other in ids[1:]:
+            parent[find(other)] = find(ids[0])
+
+    groups = {}
+    for profile_id in parent:
+        groups.setdefault(find(profile_id), []).append(profile_id)
+
+    merge_groups = []
+    conflicts = []
+    for ids in groups.values():
+        ids = sorted(ids)
+        placeholders = ','.join('?' for _ in ids)
+        cursor.execute(
+            f'SELECT id, email_key FROM profiles WHERE id IN ({placeholders})',
+            ids
+        )
+        by_email = {}
+        for profile_id, email_key in cursor.fetchall():
+            if email_key:
+                by_email.setdefault(email_key, []).append(profile_id)
+
+        if len(by_email) <= 1:
+            merge_groups.append(ids)
+        else:
+            conflicts.append(ids)
+            merge_groups.extend(sorted(same) for same in by_email.values() if len(same) > 1)
+
+    conn.close()
+    return merge_groups, conflicts
+
+
+def merge_profiles(keep_id, duplicate_ids):
+    '''
+       Merge duplicate profiles into one.
+
+       1. Fill empty fields on the kept profile from the duplicates (newest first).
+       2. Re-point sessions and bookings to the kept profile.
+       3. Delete the duplicates, recording each one in profile_merges.
+
+       All in ONE transaction - either the whole merge happens or none of it.
+
+       Returns the contact values that were NOT kept, as
+       (profile_id, column, value) tuples, so the caller can log them.
+    '''
+    conn = get_connection()
+    cursor = conn.cursor()
+    placeholders = ','.join('?' for _ in duplicate_ids)
+
+    try:
+        cursor.execute(
+            f'''SELECT id, full_name, email, phone, email_key, phone_key FROM profiles
+                WHERE id IN (?, {placeholders}) ORDER BY id DESC''',
+            (keep_id, *duplicate_ids)
+        )
+        rows = cursor.fetchall()
+
+        # Each raw value travels WITH its key, from ONE source row: the kept
+        # profile's own value, else the newest duplicate's (keyed ones first). Mixing rows
+        # could leave phone '333-4444' with the key of a different number.
+        kept_row = next(row for row in rows if row[0] == keep_id)
+        fields = {'full_name': (1, None), 'email': (2, 4), 'phone': (3, 5)}
+
+        dropped = []
+        updates = {}
+        for column, (value_index, key_index) in fields.items():
+            # Prefer duplicates whose value could be normalized (has a key).
+            candidates = [row for row in rows if row[value_index] is not None]
+            if key_index:
+                candidates.sort(key=lambda row: row[key_index] is None)
+            source = kept_row if kept_row[value_index] is not None else next(iter(candidates), None)
+            if source is None:
+                continue
+
+            if source is not kept_row:
+                updates[column] = source[value_index]
+                if key_index:
+                    updates[column + '_key'] = source[key_index]
+
+            # Log duplicate values that differ from the one we keep.
+            for row in rows:
+                if row is source or row[0] == keep_id or row[value_index] is None:
+                    continue
+                if key_index and row[key_index] and source[key_index]:
+                    same = row[key_index] == source[key_index]
+                else:
+                    same = row[value_index].strip().lower() == source[value_index].strip().lower()
+                if not same:
+                    dropped.append((row[0], column, row[value_index]))
+
+        if updates:
+            assignments = ', '.join(f'{column} = ?' for column in updates)
+            cursor.execute(
+                f'UPDATE profiles SET {assignments} WHERE id = ?',
+                (*updates.values(), keep_id)
+            )
+
+        cursor.execute(
+            f'UPDATE sessions SET profile_id = ? WHERE profile_id IN ({placeholders})',
+            (keep_id, *duplicate_ids)
+        )
+        cursor.execute(
+            f'UPDATE bookings SET profile_id = ? WHERE profile_id IN ({placeholders})',
+            (keep_id, *duplicate_ids)
+        )
+        cursor.execute(
+            f'DELETE FROM profiles WHERE id IN ({placeholders})',
+            tuple(duplicate_ids)
+        )
+        cursor.executemany(
+            'INSERT INTO profile_merges (kept_profile_id, merged_profile_id) VALUES (?, ?)',
+            [(keep_id, duplicate_id) for duplicate_id in duplicate_ids]
+        )
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return dropped
+
+
+# ============ Export Operations ========================
+
+# Only these tables can be exported - table names can't be passed as
+# '?' parameters, so we whitelist them instead of formatting raw input into SQL.
+EXPORTABLE_TABLES = ('profiles', 'sessions', 'messages', 'bookings', 'profile_merges')
+
+
+def get_export_watermark(table_name):
+    '''
+       Get the last exported id for a table (0 if never exported).
+    '''
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(
+        'SELECT last_id FROM export_watermarks WHERE table_name = ?',
+        (table_name,)
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+
+def set_export_watermark(table_name, last_id):
+    '''
+       Save the last exported id for a table.
+
+       Only called AFTER the export file is fully written, so a crashed
+       run simply re-exports the same rows next time (at-least-once).
+    '''
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        INSERT INTO export_watermarks (table_name, last_id, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (table_name) DO UPDATE SET
+            last_id = excluded.last_id,
+            updated_at = excluded.updated_at
+    ''', (table_name, last_id))
+
+    conn.commit()
+    conn.close()
+
+
+def iter_new_rows(table_name, after_id, chunk_size=10000):
+    '''
+       Stream rows with id > after_id in chunks.
+
+       Yields (column_names, rows) tuples, one per chunk.
+
+       why chunks? fetchall() on a multi-million row table would load
+       everything into memory. The SQLite cursor steps through the result
+       lazily, so fetchmany() keeps memory bounded to one chunk.
+
+       The upper bound is fixed to MAX(id) at the start so rows inserted
+       while we export are left for the next run (a consistent snapshot).
+    '''
+    if table_name not in EXPORTABLE_TABLES:
+        raise ValueError(f'Table {table_name} is not exportable')
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f'SELECT MAX(id) FROM {table_name}')
+        max_id = cursor.fetchone()[0]
+        if max_id is None or max_id <= after_id:
+            return
+
+        # Range scan on the primary key - no full table scan.
+        cursor.execute(
+            f'SELECT * FROM {table_name} WHERE id > ? AND id <= ? ORDER BY id',
+            (after_id, max_id)
+        )
+        columns = [description[0] for description in cursor.description]
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield columns, rows
+    finally:
+        conn.close()
@@ -0,0 +1,73 @@
+'''
+    Profile deduplication job
+    Demonstrates: Identity resolution, data cleaning, transactional merges.
+
+    Before contact keys were normalized, "Bob@Example.com" and
+    "bob@example.com" (or "(123) 456-7890" and "123.456.7890") created
+    separate profiles. This job merges them into one.
+
+    Grouping uses the indexed email_key / phone_key columns, so there is
+    no pairwise comparison of every profile against every other.
+'''
+
+from datetime import datetime
+from database import (
+    initialize_database,
+    backfill_contact_keys,
+    get_duplicate_profile_groups,
+    merge_profiles
+)
+
+
+def run_dedup_job():
+    '''
+       Find and merge duplicate profiles.
+
+       1. Make sure every profile has normalized keys.
+       2. Group profiles sharing an email or phone key.
+       3. Merge each group into its oldest profile, logging any contact
+          values that don't survive the merge.
+
+       Groups linked by phone but holding different emails are reported
+       for manual review - only their same-email profiles are merged.
+    '''
+    print("=" * 50)
+    print("Running Dedup Job")
+    print(f'Time: {datetime.now()}')
+    print("=" * 50)
+
+    initialize_database()
+
+    backfilled = backfill_contact_keys()
+    if backfilled:
+        print(f'Backfilled contact keys for {backfilled} profiles.')
+
+    groups, conflicts = get_duplicate_profile_groups()
+
+    for profile_ids in conflicts:
+        print(f'Review needed: profiles {profile_ids} share a phone but have different emails.')
+
+    if not groups:
+        print("No duplicate profiles found.")
+        return
+
+    print(f'Found {len(groups)} groups of duplicates.')
+
+    merged_count = 0
+    for profile_ids in groups:
+        keep_id, duplicate_ids = profile_ids[0], profile_ids[1:]
+        print(f'\nMerging {duplicate_ids} into profile {keep_id}')
+        for profile_id, column, value in merge_profiles(keep_id, duplicate_ids):
+            print(f" Dropped {column} '{value}' from profile {profile_id}")
+        merged_count += len(duplicate_ids)
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("Job Complete")
+    print(f' Profiles merged: {merged_count}')
+    print(f' Groups needing review: {len(conflicts)}')
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    run_dedup_job()
@@ -0,0 +1,187 @@
+'''
+    Incremental data export job
+    Demonstrates: Incremental loads, watermarks, streaming, file manifests.
+
+    This is the 'L' in ETL for downstream systems - it hands our data to a
+    data warehouse or another pipeline as JSONL or CSV files.
+
+    Each run only exports rows added since the last run (tracked with a
+    WATERMARK on each table's id), so nightly runs stay fast as tables grow.
+
+    The export is INSERT-ONLY: rows that change after they were exported
+    (reminder_sent flips, profile updates) are not sent again. Profiles
+    deleted by the dedup job are listed in the profile_merges table, which
+    is exported like any other - but the sessions and bookings re-pointed
+    by a merge are not. Run with --full to re-export everything.
+
+    Usage:
+        python export_job.py                 # JSONL
+        python export_job.py --format csv    # CSV
+        python export_job.py --gzip          # compressed output
+        python export_job.py --full          # ignore watermarks, export all rows
+'''
+
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from config import EXPORT_DIR, EXPORT_CHUNK_SIZE
+from database import (
+    initialize_database,
+    EXPORTABLE_TABLES,
+    get_export_watermark,
+    set_export_watermark,
+    iter_new_rows
+)
+
+
+def open_export_file(path, use_gzip):
+    '''
+       Open an output file for writing text, compressed or not.
+    '''
+    if use_gzip:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def file_checksum(path):
+    '''
+       Compute the SHA-256 of a file, reading it in blocks.
+
+       Downstream jobs recompute this to verify the file wasn't truncated
+       or corrupted in transit.
+    '''
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def export_table(table_name, run_stamp, output_format='jsonl', use_gzip=False, full=False):
+    '''
+       Export new rows of one table to a single file.
+
+       Returns a manifest entry (dict), or None if there was nothing new.
+       The watermark is NOT moved here - see run_export_job.
+       full=True exports every row, to pick up updated and merged rows.
+    '''
+    after_id = 0 if full else get_export_watermark(table_name)
+
+    file_name = f'{table_name}_{run_stamp}.{output_format}'
+    if use_gzip:
+        file_name += '.gz'
+    path = os.path.join(EXPORT_DIR, file_name)
+
+    row_count = 0
+    first_id = None
+    last_id = None
+    f = None
+
+    try:
+        for columns, rows in iter_new_rows(table_name, after_id, EXPORT_CHUNK_SIZE):
+            id_index = columns.index('id')
+
+            # Only create the file once we know there are rows.
+            if f is None:
+                f = open_export_file(path, use_gzip)
+                if output_format == 'csv':
+                    writer = csv.writer(f)
+                    writer.writerow(columns)
+
+            if output_format == 'csv':
+                writer.writerows(rows)
+            else:
+                f.write(''.join(
+                    json.dumps(dict(zip(columns, row)), default=str) + '\n'
+                    for row in rows
+                ))
+
+            row_count += len(rows)
+            if first_id is None:
+                first_id = rows[0][id_index]
+            last_id = rows[-1][id_index]
+    finally:
+        if f is not None:
+            f.close()
+
+    if row_count == 0:
+        return None
+
+    return {
+        'table': table_name,
+        'file': file_name,
+        'format': output_format,
+        'gzip': use_gzip,
+        'full': full,
+        'rows': row_count,
+        'first_id': first_id,
+        'last_id': last_id,
+        'bytes': os.path.getsize(path),
+        'sha256': file_checksum(path)
+    }
+
+
+def run_export_job(output_format='jsonl', use_gzip=False, tables=EXPORTABLE_TABLES, full=False):
+    '''
+       Export new rows from every table and write a manifest.
+
+       The manifest lists each file with its row count and checksum, so
+       the downstream loader knows exactly what to expect.
+    '''
+    print("=" * 50)
+    print("Running Export Job")
+    print(f'Time: {datetime.now()}')
+    print("=" * 50)
+
+    initialize_database()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+
+    run_stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    files = []
+
+    for table_name in tables:
+        entry = export_table(table_name, run_stamp, output_format, use_gzip, full)
+        if entry:
+            files.append(entry)
+            print(f" {table_name}: {entry['rows']} rows -> {entry['file']}")
+        else:
+            print(f' {table_name}: no new rows')
+
+    manifest_path = None
+    if files:
+        manifest = {
+            'run_at': datetime.now().isoformat(),
+            'total_rows': sum(entry['rows'] for entry in files),
+            'files': files
+        }
+        manifest_path = os.path.join(EXPORT_DIR, f'manifest_{run_stamp}.json')
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Move watermarks only once the files AND manifest are on disk.
+        # If the job dies earlier, the next run re-exports the same rows.
+        for entry in files:
+            set_export_watermark(entry['table'], entry['last_id'])
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("Job Complete")
+    print(f' Files written: {len(files)}')
+    if manifest_path:
+        print(f' Manifest: {manifest_path}')
+    print("=" * 50)
+    return manifest_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Incremental data export.')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--full', action='store_true', help='ignore watermarks and export every row')
+    args = parser.parse_args()
+
+    run_export_job(args.format, args.gzip, full=args.full)
@@ -6,6 +6,7 @@
 '''
 
 import re
+from datetime import datetime
 from config import AGENT_NAME
 
 def extract_contact_info(conversation_history):
@@ -68,6 +69,75 @@ def extract_phone(text):
     match = re.search(pattern, text)
     return match.group(0) if match else None
 
+def normalize_email(email):
+    '''
+       Turn an email into a matching key.
+
+       Emails are case-insensitive in practice, so "Bob@Example.com " and
+       "bob@example.com" should find the same profile.
+    '''
+    if not email:
+        return None
+    return email.strip().lower() or None
+
+def normalize_phone(phone):
+    '''
+       Turn a phone number into a matching key (E.164 style).
+
+       "(123) 456-7890", "123.456.7890" and "+1 123 456 7890" all become
+       "+11234567890". Numbers with a '+' keep their own country code
+       (E.164 allows up to 15 digits); 10-digit numbers without one are
+       assumed to be US/Canada (+1).
+
+       Returns None if it can't be a full number - e.g. "456-7890" has no
+       area code, so it would match customers in every area code.
+    '''
+    if not phone:
+        return None
+
+    digits = re.sub(r'\D', '', phone)
+
+    # An explicit '+' means the country code is already there -
+    # "+49 30 123456" must not be mistaken for a 10-digit US number.
+    if phone.strip().startswith('+'):
+        return '+' + digits if 8 <= len(digits) <= 15 else None
+
+    if len(digits) == 10:
+        return '+1' + digits
+    if len(digits) == 11 and digits.startswith('1'):
+        return '+' + digits
+    return None
+
+def parse_timestamp(value):
+    '''
+       Turn a scheduled_for value into a datetime (None if invalid).
+
+       Everything in this app uses naive local time (datetime.now()), so a
+       value with a UTC offset is converted to local time - otherwise
+       comparing it with naive datetimes raises a TypeError.
+    '''
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def normalize_timestamp(value):
+    '''
+       Turn a scheduled_for value into one stored format: 'YYYY-MM-DD HH:MM:SS'.
+
+       SQL compares these as TEXT, so "2030-01-07T10:00:00+00:00" and
+       "2030-01-07 10:00:00" must be written the same way to sort and
+       range-filter correctly. Unparseable values are kept as they are.
+    '''
+    parsed = parse_timestamp(value)
+    if parsed is None:
+        return value
+    return parsed.isoformat(sep=' ')
+
 def extract_name(text):
     '''
        Try to find a person's name in text.
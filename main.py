@@ -13,13 +13,55 @@ from database import (
     create_session,
     save_message,
     get_session_messages,
-    create_or_update_profile,
-    create_booking
+    create_or_update_profile
 )
 
+from datetime import datetime
+from config import SLOT_OFFER_COUNT
 from ai_chat import get_ai_response
 from extractor import extract_contact_info
 from email_sender import send_welcome_email
+from scheduler import load_booking_index, refresh_booking_index, find_free_slots, book_slot
+
+# Words that mean the user wants to book a consultation.
+BOOKING_KEYWORDS = ['book', 'schedule', 'appointment', 'consultation']
+
+
+def wants_booking(text):
+    '''
+       Does the user's message ask to book something?
+    '''
+    text = text.lower()
+    return any(keyword in text for keyword in BOOKING_KEYWORDS)
+
+
+def offer_slots(session_id):
+    '''
+       Show the next open slots and let the user pick one.
+
+       Slots come from the scheduler's in-memory index - no table scan.
+       Returns the chosen datetime, or None if the user skipped.
+    '''
+    # Pick up bookings other sessions made since we started.
+    refresh_booking_index()
+    slots = find_free_slots(datetime.now(), SLOT_OFFER_COUNT)
+    if not slots:
+        print('Bot: Sorry, there are no open slots right now.\n')
+        return None
+
+    lines = [f'{i}. {slot:%A %b %d, %I:%M %p}' for i, slot in enumerate(slots, start=1)]
+    offer = 'Here are the next open consultation slots:\n' + '\n'.join(lines)
+    save_message(session_id, 'bot', offer)
+    print(f'Bot: {offer}\n')
+
+    choice = input("Pick a slot number (or press Enter to skip): ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(slots):
+        chosen = slots[int(choice) - 1]
+        print(f'\n[{chosen:%A %b %d, %I:%M %p} will be booked once we have your email - if it is still free]\n')
+        return chosen
+
+    print()
+    return None
 
 
 def main():
@@ -30,8 +72,9 @@ def main():
        1. Initialize DataBase
        2. Create chat session
        3. Loop: get user input -> AI response -> save both
+          (offer open slots when the user asks to book)
        4. Extract contact info when conversation ends
-       5. Save profile and send welcome email   
+       5. Save profile, book the chosen slot, send welcome email   
     '''
 
     print("=" * 50)
@@ -42,12 +85,15 @@ def main():
 
     # Step 1: Initialize the database
     initialize_database()
+    load_booking_index()
 
     # Step 2: Create a new chat session
     session_id = create_session()
     print(f'[Session {session_id} started]')
     print()
 
+    chosen_slot = None
+
     # Step 3: Main conversation loop
     while True:
         # Get user input
@@ -77,6 +123,10 @@ def main():
         # Display response
         print(f'\nBot: {bot_response}\n')
 
+        # Offer open slots if the user wants to book
+        if chosen_slot is None and wants_booking(user_input):
+            chosen_slot = offer_slots(session_id)
+
     # Step 4: Conversation ended - extract contact info
     print("\nAnalyzing conversation for contact information...")
     history = get_session_messages(session_id)
@@ -93,11 +143,21 @@ def main():
         )
         print(f'\nProfile saved! ID: {profile_id}')
 
+        # Book the slot the user picked (checked against the database)
+        if chosen_slot:
+            booking_id = book_slot(profile_id, session_id, chosen_slot)
+            if booking_id:
+                print(f'Booking confirmed! ID: {booking_id} at {chosen_slot:%A %b %d, %I:%M %p}')
+            else:
+                print('Sorry, that slot was just taken - please book again.')
+
         # Send welcome email
         if contact_info['name']:
             send_welcome_email(contact_info['email'], contact_info['name'])
     else:
         print('\nNo email found - profile not created.')
+        if chosen_slot:
+            print(f'Your slot ({chosen_slot:%A %b %d, %I:%M %p}) was NOT booked - we need an email to confirm it.')
     
     print('\nSession complete. Goodbye!')
 
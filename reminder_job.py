@@ -9,11 +9,26 @@
     - Daily Job to process unpaid claims.
     - Weekly report generation
     - Automated data validation checks.
+
+    It can also run as a long-lived DAEMON (python reminder_job.py --daemon)
+    that sends each reminder close to its due time instead of waiting
+    for the next cron run.
 '''
 
+import heapq
+import sqlite3
+import sys
+import time
 from datetime import datetime, timedelta
-from database import get_pending_reminders, mark_reminder_sent
+from config import (
+    REMINDER_LEAD_TIME_HOURS,
+    REMINDER_POLL_SECONDS,
+    REMINDER_RETRY_SECONDS,
+    REMINDER_MAX_ATTEMPTS
+)
+from database import get_pending_reminders, claim_reminder, release_reminder
 from email_sender import send_reminder_email
+from extractor import parse_timestamp
 
 
 def run_reminder_job():
@@ -48,18 +63,30 @@ def run_reminder_job():
     # Process each one.
     success_count = 0
     fail_count = 0
+    skip_count = 0
+    now = datetime.now()
 
     for booking_id, scheduled_for, name, email in pending:
+        # Same timing as the daemon: not before the lead time, never after
+        # the appointment. Otherwise cron would send reminders days early.
+        if appointment_passed(scheduled_for, now) or reminder_due_time(scheduled_for) > now:
+            skip_count += 1
+            continue
+
         print(f'\nProcessing: {name} ({email})')
         print(f' Scheduled for: {scheduled_for}')
 
+        # Claim it first - the reminder daemon may have sent it already
+        if not claim_reminder(booking_id):
+            print(" Status: SKIPPED (already sent)")
+            continue
+
         # Send the reminder email
         if send_reminder_email(email, name, scheduled_for):
-            # Mark as sent in database
-            mark_reminder_sent(booking_id)
             success_count += 1
             print(" Status: SENT")
         else:
+            release_reminder(booking_id)
             fail_count += 1
             print(" Status: FAILED")
 
@@ -68,8 +95,153 @@ def run_reminder_job():
     print("Job Complete")
     print(f' Successful: {success_count}')
     print(f' Failed: {fail_count}')
+    print(f' Not due / already past: {skip_count}')
     print("=" * 50)
 
+
+def appointment_passed(scheduled_for, now):
+    '''
+       Has the appointment already happened?
+
+       A "your consultation is coming up" email is wrong after that.
+    '''
+    scheduled = parse_timestamp(scheduled_for)
+    return scheduled is not None and scheduled < now
+
+
+def reminder_due_time(scheduled_for):
+    '''
+       When should the reminder for a booking be sent?
+
+       REMINDER_LEAD_TIME_HOURS before the booking, in naive local time so
+       every heap entry compares. If the timestamp can't be parsed, it is
+       due right away (same as the batch job).
+    '''
+    scheduled = parse_timestamp(scheduled_for)
+    if scheduled is None:
+        return datetime.now()
+    return scheduled - timedelta(hours=REMINDER_LEAD_TIME_HOURS)
+
+
+def load_new_reminders(heap, last_id):
+    '''
+       Push bookings with id > last_id onto the heap.
+
+       Returns the new high-water mark (the largest booking id seen).
+       Because we only ask for ids above the mark, each poll reads just
+       the new rows - not the whole bookings table.
+
+       Appointments that are already over are skipped.
+    '''
+    now = datetime.now()
+    for booking_id, scheduled_for, name, email in get_pending_reminders(last_id):
+        last_id = max(last_id, booking_id)
+        if appointment_passed(scheduled_for, now):
+            continue
+
+        due = reminder_due_time(scheduled_for)
+        heapq.heappush(heap, (due, booking_id, 0, scheduled_for, name, email))
+    return last_id
+
+
+def send_due_reminder(heap, entry, now):
+    '''
+       Claim and send one due reminder.
+
+       A failed send is released and pushed back onto the heap, until
+       REMINDER_MAX_ATTEMPTS is reached.
+    '''
+    due, booking_id, attempts, scheduled_for, name, email = entry
+    print(f'\nProcessing: {name} ({email})')
+    print(f' Scheduled for: {scheduled_for}')
+
+    # Retries can run past the appointment itself.
+    if appointment_passed(scheduled_for, now):
+        print(" Status: SKIPPED (appointment already over)")
+        return
+
+    try:
+        # Someone else (cron job, another daemon) may have sent it already.
+        if not claim_reminder(booking_id):
+            print(" Status: SKIPPED (already sent)")
+            return
+
+        if send_reminder_email(email, name, scheduled_for):
+            print(" Status: SENT")
+            return
+
+        release_reminder(booking_id)
+    except sqlite3.Error as e:
+        print(f' Database error: {e}')
+
+    attempts += 1
+    if attempts >= REMINDER_MAX_ATTEMPTS:
+        print(f" Status: FAILED - giving up after {attempts} attempts")
+        return
+
+    retry_at = now + timedelta(seconds=REMINDER_RETRY_SECONDS)
+    heapq.heappush(heap, (retry_at, booking_id, attempts, scheduled_for, name, email))
+    print(f" Status: FAILED - retrying at {retry_at}")
+
+
+def run_reminder_daemon():
+    '''
+       Long-running reminder scheduler.
+
+       Uses a MIN-HEAP keyed on due time:
+       1. Load all pending bookings once.
+       2. Sleep until the earliest reminder is due (or the next poll).
+       3. Send every reminder that is due, then poll for new bookings.
+
+       The heap gives us the next due reminder in O(1) and inserts in
+       O(log n), so we never rescan the whole table. Failed emails are
+       pushed back with a retry delay, up to REMINDER_MAX_ATTEMPTS times.
+    '''
+    print("=" * 50)
+    print("Running Reminder Daemon")
+    print(f'Time: {datetime.now()}')
+    print("Press Ctrl+C to stop.")
+    print("=" * 50)
+
+    heap = []
+    last_id = load_new_reminders(heap, 0)
+    print(f'Loaded {len(heap)} pending reminders.')
+
+    next_poll = time.monotonic() + REMINDER_POLL_SECONDS
+
+    try:
+        while True:
+            # Send everything that is due now.
+            now = datetime.now()
+            while heap and heap[0][0] <= now:
+                send_due_reminder(heap, heapq.heappop(heap), now)
+
+            # Pick up bookings created since the last poll.
+            # A locked database shouldn't kill the daemon - try again next poll.
+            if time.monotonic() >= next_poll:
+                before = len(heap)
+                try:
+                    last_id = load_new_reminders(heap, last_id)
+                except sqlite3.Error as e:
+                    print(f'Poll failed, will retry: {e}')
+                if len(heap) > before:
+                    print(f'Picked up {len(heap) - before} new bookings.')
+                next_poll = time.monotonic() + REMINDER_POLL_SECONDS
+
+            # Sleep until the next reminder is due or it's time to poll.
+            sleep_for = next_poll - time.monotonic()
+            if heap:
+                until_due = (heap[0][0] - datetime.now()).total_seconds()
+                sleep_for = min(sleep_for, until_due)
+            time.sleep(max(sleep_for, 0))
+
+    except KeyboardInterrupt:
+        print("\nReminder daemon stopped.")
+
+
 if __name__ == "__main__":
-    run_reminder_job()
+    if '--daemon' in sys.argv:
+        run_reminder_daemon()
+    else:
+        run_reminder_job()
     
\ No newline at end of file
@@ -0,0 +1,211 @@
+'''
+    Booking availability engine
+    Demonstrates: In-memory indexes, binary search, conflict detection.
+
+    Bookings are kept in a SORTED list of (start, end, booking_id) intervals.
+    Because the list is sorted by start time, binary search (bisect) finds
+    the few bookings near a slot in O(log n) - no table scan per question.
+
+    Two questions it answers:
+    - "does this slot conflict?"      -> has_conflict()
+    - "next N free slots after T"     -> find_free_slots()
+
+    The index is built once from the bookings table (load_booking_index)
+    and topped up with newer booking ids (refresh_booking_index). It is
+    only used to OFFER slots - book_slot() does the final check in the
+    database, because other chat sessions book from other processes.
+'''
+
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from config import (
+    BOOKING_DURATION_MINUTES,
+    PROVIDER_CAPACITY,
+    BUSINESS_HOURS_START,
+    BUSINESS_HOURS_END
+)
+from database import create_booking_if_free, get_booking_intervals
+from extractor import parse_timestamp
+
+# How far ahead find_free_slots() will look before giving up.
+SLOT_SEARCH_DAYS = 60
+
+# The index: sorted by start time.
+_intervals = []
+
+# Largest booking id in the index - refresh_booking_index() loads ids above it.
+_last_loaded_id = 0
+
+# Longest booking in the index. A booking overlapping a slot must start
+# no earlier than (slot start - longest duration), which bounds the search.
+_max_duration = timedelta(minutes=BOOKING_DURATION_MINUTES)
+
+
+def add_to_index(booking_id, start, duration_minutes):
+    '''
+       Insert one booking into the sorted index - O(log n) search.
+    '''
+    global _max_duration, _last_loaded_id
+
+    duration = timedelta(minutes=duration_minutes or BOOKING_DURATION_MINUTES)
+    insort(_intervals, (start, start + duration, booking_id))
+    _max_duration = max(_max_duration, duration)
+    _last_loaded_id = max(_last_loaded_id, booking_id)
+
+
+def index_since():
+    '''
+       Only bookings from yesterday on are indexed - older ones can't
+       overlap anything we'd offer.
+    '''
+    return (datetime.now() - timedelta(days=1)).isoformat(sep=' ')
+
+
+def refresh_booking_index():
+    '''
+       Add bookings created since the last load (by any session).
+
+       Only ids above the high-water mark are read, so this is cheap.
+    '''
+    for booking_id, scheduled_for, duration_minutes in get_booking_intervals(index_since(), _last_loaded_id):
+        start = parse_timestamp(scheduled_for)
+        if start:
+            add_to_index(booking_id, start, duration_minutes)
+
+
+def load_booking_index():
+    '''
+       Rebuild the index from the bookings table.
+
+       Called once at startup.
+    '''
+    global _max_duration, _last_loaded_id
+
+    _intervals.clear()
+    _max_duration = timedelta(minutes=BOOKING_DURATION_MINUTES)
+    _last_loaded_id = 0
+
+    refresh_booking_index()
+    return len(_intervals)
+
+
+def exceeds_capacity(start, end, overlaps):
+    '''
+       Would one more booking in [start, end) exceed provider capacity?
+
+       overlaps: (start, end) pairs of existing bookings that overlap it.
+
+       With PROVIDER_CAPACITY = 1 any overlap is a conflict. With more
+       capacity we check how many bookings run at the same moment.
+       Concurrency only goes up when a booking starts, so checking at
+       'start' and at each overlapping booking's start is enough.
+    '''
+    if len(overlaps) < PROVIDER_CAPACITY:
+        return False
+
+    check_points = [start] + [s for s, e in overlaps if s > start]
+    for point in check_points:
+        running = sum(1 for s, e in overlaps if s <= point < e)
+        if running >= PROVIDER_CAPACITY:
+            return True
+    return False
+
+
+def overlapping_bookings(start, end):
+    '''
+       Get the indexed bookings that overlap [start, end).
+
+       Binary search narrows it to bookings starting in
+       [start - longest duration, end), then we keep the ones that
+       actually end after 'start'.
+    '''
+    lo = bisect_left(_intervals, (start - _max_duration,))
+    hi = bisect_left(_intervals, (end,))
+    return [(s, e) for s, e, booking_id in _intervals[lo:hi] if e > start]
+
+
+def has_conflict(start, duration_minutes=BOOKING_DURATION_MINUTES):
+    '''
+       Does a booking at 'start' conflict with the in-memory index?
+    '''
+    end = start + timedelta(minutes=duration_minutes)
+    return exceeds_capacity(start, end, overlapping_bookings(start, end))
+
+
+def candidate_slots(after, duration_minutes):
+    '''
+       Generate slot start times after 'after', inside business hours.
+
+       Slots are lined up on a grid of the booking duration
+       (9:00, 9:30, 10:00, ...). Weekends are skipped.
+    '''
+    step = timedelta(minutes=duration_minutes)
+    day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    for _ in range(SLOT_SEARCH_DAYS):
+        if day.weekday() < 5:
+            slot = day.replace(hour=BUSINESS_HOURS_START)
+            closing = day.replace(hour=BUSINESS_HOURS_END)
+            while slot + step <= closing:
+                if slot >= after:
+                    yield slot
+                slot += step
+        day += timedelta(days=1)
+
+
+def find_free_slots(after, count, duration_minutes=BOOKING_DURATION_MINUTES):
+    '''
+       Get the next 'count' open slots after 'after'.
+
+       Each candidate is an O(log n) index check, so this never touches
+       the database.
+    '''
+    free = []
+    for slot in candidate_slots(after, duration_minutes):
+        if not has_conflict(slot, duration_minutes):
+            free.append(slot)
+            if len(free) == count:
+                break
+    return free
+
+
+def book_slot(profile_id, session_id, start, duration_minutes=BOOKING_DURATION_MINUTES):
+    '''
+       Book a slot if it is still free.
+
+       Returns the booking ID, or None if the slot now conflicts.
+
+       The in-memory index may be stale (other sessions book too), so the
+       final check runs against the database inside the INSERT's
+       transaction - see database.create_booking_if_free().
+    '''
+    # Pick up other sessions' bookings, so _max_duration covers them too.
+    refresh_booking_index()
+
+    end = start + timedelta(minutes=duration_minutes)
+    lookback = max(_max_duration, timedelta(minutes=duration_minutes))
+
+    def conflicts(rows):
+        overlaps = []
+        for booking_id, scheduled_for, existing_minutes in rows:
+            existing_start = parse_timestamp(scheduled_for)
+            if existing_start is None:
+                continue
+            existing_end = existing_start + timedelta(minutes=existing_minutes or BOOKING_DURATION_MINUTES)
+            if existing_end > start:
+                overlaps.append((existing_start, existing_end))
+        return exceeds_capacity(start, end, overlaps)
+
+    booking_id = create_booking_if_free(
+        profile_id,
+        session_id,
+        start.isoformat(sep=' '),
+        duration_minutes,
+        (start - lookback).isoformat(sep=' '),
+        end.isoformat(sep=' '),
+        conflicts
+    )
+
+    if booking_id:
+        refresh_booking_index()
+    return booking_id